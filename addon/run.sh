@@ -682,7 +682,19 @@ run_tunnel() {
 start_webapp() {
     bashio::log.info "Starting setup web UI on port 8099..."
     cd /webapp
-    gunicorn --bind 0.0.0.0:8099 --workers 1 --threads 2 --timeout 30 app:app &
+
+    # Runs before read_config, so check log_level directly. In debug mode
+    # the web UI pretty-prints its state files.
+    local webapp_debug=false
+    if [ "$(bashio::config 'log_level')" = "debug" ]; then
+        webapp_debug=true
+    fi
+
+    # Single worker: a single-user setup UI doesn't need more processes, and
+    # the per-process BOOT_ID would make / ETags miss across workers.
+    # Threads let status polls run while a deploy is in flight.
+    DEBUG="$webapp_debug" gunicorn --bind 0.0.0.0:8099 --worker-class gthread --workers 1 --threads 8 \
+        --timeout 30 app:app &
     webapp_pid=$!
     bashio::log.info "Web UI started (pid: $webapp_pid)"
 }
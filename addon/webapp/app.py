@@ -6,34 +6,140 @@ Uses service account authentication - fully self-contained in user's project.
 """
 
 import os
-import json
+import base64
 import secrets
+import tempfile
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, Response, make_response, render_template, request
+from flask.json.provider import JSONProvider
+import orjson
+import httpx
 import requests
 from google.oauth2 import service_account
 from google.auth.transport.requests import Request
+from jinja2 import FileSystemBytecodeCache
+
+
+class OrjsonProvider(JSONProvider):
+    """Flask JSON provider backed by orjson (request.json, tojson filter)."""
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
 
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 app.secret_key = secrets.token_hex(32)
 
+# Templates only change with a new add-on image: skip reload checks, keep
+# compiled bytecode on disk and compile everything once at startup
+JINJA_CACHE_DIR = Path("/tmp/jinja_cache")
+JINJA_CACHE_DIR.mkdir(exist_ok=True)
+app.config["TEMPLATES_AUTO_RELOAD"] = False
+app.jinja_env.bytecode_cache = FileSystemBytecodeCache(str(JINJA_CACHE_DIR))
+for _template in app.jinja_env.list_templates():
+    app.jinja_env.get_template(_template)
+
+# Distinguishes ETags across restarts, which may ship new templates
+BOOT_ID = secrets.token_hex(4)
+
 # Paths
 DATA_DIR = Path("/data")
 SA_KEY_FILE = DATA_DIR / "service_account.json"
 SETUP_FILE = DATA_DIR / "setup_state.json"
 
+# Set by the Supervisor at container start and fixed for the process lifetime
+INGRESS_PATH = os.environ.get("INGRESS_PATH", "")
+SUPERVISOR_TOKEN = os.environ.get("SUPERVISOR_TOKEN")
+
+# State files are only read back by this process - pretty-print them only
+# when debugging (run.sh sets DEBUG=true for log_level: debug)
+DEBUG = os.environ.get("DEBUG", "false").lower() == "true"
+JSON_WRITE_OPTS = orjson.OPT_INDENT_2 if DEBUG else 0
+
 # Pre-built tunnel server image
 TUNNEL_IMAGE = "ghcr.io/bramalkema/ha-edge/server:latest"
 
+# Cloud Run service location
+REGION = "us-central1"
+SERVICE_NAME = "ha-tunnel"
+
+# Knative service spec for the v1 Cloud Run API, serialised once. The
+# project and password placeholders are substituted per deploy.
+_SERVICE_CONFIG_TEMPLATE = orjson.dumps({
+    "apiVersion": "serving.knative.dev/v1",
+    "kind": "Service",
+    "metadata": {
+        "name": SERVICE_NAME,
+        "namespace": "__PROJECT_ID__",
+        "annotations": {
+            "run.googleapis.com/ingress": "all",
+            "run.googleapis.com/launch-stage": "BETA"
+        }
+    },
+    "spec": {
+        "template": {
+            "metadata": {
+                "annotations": {
+                    "autoscaling.knative.dev/minScale": "0",
+                    "autoscaling.knative.dev/maxScale": "1",
+                    "run.googleapis.com/cpu-throttling": "true"
+                }
+            },
+            "spec": {
+                "containerConcurrency": 80,
+                "timeoutSeconds": 3600,
+                "containers": [{
+                    "image": TUNNEL_IMAGE,
+                    "env": [
+                        {"name": "AUTH", "value": "__AUTH__"}
+                    ],
+                    "resources": {
+                        "limits": {
+                            "cpu": "1",
+                            "memory": "256Mi"
+                        }
+                    },
+                    "ports": [{"containerPort": 8080}]
+                }]
+            }
+        }
+    }
+})
+
+# Makes the service publicly invocable (the tunnel does its own auth)
+_IAM_POLICY_BODY = orjson.dumps({
+    "policy": {
+        "bindings": [{
+            "role": "roles/run.invoker",
+            "members": ["allUsers"]
+        }]
+    }
+})
+
 # Required scopes
 SCOPES = ["https://www.googleapis.com/auth/cloud-platform"]
 
+# Shared HTTP client - multiplexes calls to googleapis.com over HTTP/2 and
+# keeps the supervisor connection alive instead of handshaking every request
+http = httpx.Client(
+    timeout=httpx.Timeout(30.0, connect=10.0),
+    transport=httpx.HTTPTransport(
+        http2=True,
+        retries=3,  # connection failures only
+        limits=httpx.Limits(max_connections=8, max_keepalive_connections=8),
+    ),
+)
 
-def get_ingress_path():
-    """Get the ingress base path from environment."""
-    return os.environ.get("INGRESS_PATH", "")
+# Transient GCP statuses worth retrying on idempotent calls
+RETRY_STATUSES = {429, 500, 502, 503, 504}
 
 
 def generate_project_name():
@@ -44,48 +150,158 @@ def generate_project_name():
 
 def generate_password():
     """Generate a secure password."""
-    return secrets.token_urlsafe(24)
+    # 24 random bytes -> 32 URL-safe chars with no padding to strip
+    return base64.urlsafe_b64encode(os.urandom(24)).decode("ascii")
+
+
+def ojsonify(obj, status=200):
+    """Like jsonify, but encodes with orjson directly."""
+    return Response(orjson.dumps(obj), status=status, mimetype="application/json")
+
+
+_data_dir_ready = False
+
+
+def ensure_data_dir():
+    """Create the data directory on first write only."""
+    global _data_dir_ready
+    if not _data_dir_ready:
+        DATA_DIR.mkdir(exist_ok=True)
+        _data_dir_ready = True
+
+
+def write_atomic(path, data):
+    """Write bytes to path via a temp file + rename so readers never see a partial file.
+
+    Returns the new file's mtime in ns, taken before the rename so it can't
+    belong to a concurrent writer's file.
+    """
+    # Unique temp file per write so concurrent writers never share one
+    tmp = tempfile.NamedTemporaryFile(dir=path.parent, prefix=f".{path.name}.",
+                                      suffix=".tmp", delete=False)
+    try:
+        with tmp:
+            tmp.write(data)
+            tmp.flush()
+            # rename keeps the mtime, so this is the mtime readers will see
+            mtime = os.fstat(tmp.fileno()).st_mtime_ns
+        os.replace(tmp.name, path)
+    except BaseException:
+        # Don't leave temp files behind on a failed write (e.g. disk full)
+        os.unlink(tmp.name)
+        raise
+    return mtime
+
+
+def file_version(path):
+    """Return the file's mtime in ns, or 0 if it doesn't exist."""
+    try:
+        return path.stat().st_mtime_ns
+    except FileNotFoundError:
+        return 0
+
+
+# Parsed setup state and the mtime it was read at, swapped together
+_state_cache = (None, None)
 
 
 def get_setup_state():
     """Load setup state from file."""
-    if SETUP_FILE.exists():
-        return json.loads(SETUP_FILE.read_text())
-    return {"step": "start", "project_id": None, "password": None}
+    global _state_cache
+
+    try:
+        mtime = SETUP_FILE.stat().st_mtime_ns
+    except FileNotFoundError:
+        return {"step": "start", "project_id": None, "password": None}
+
+    cached_mtime, data = _state_cache
+    if mtime != cached_mtime:
+        data = orjson.loads(SETUP_FILE.read_bytes())
+        _state_cache = (mtime, data)
+
+    # Callers mutate the state before saving, so hand out a copy
+    return dict(data)
 
 
 def save_setup_state(state):
     """Save setup state to file."""
-    DATA_DIR.mkdir(exist_ok=True)
-    SETUP_FILE.write_text(json.dumps(state, indent=2))
+    global _state_cache
+
+    ensure_data_dir()
+    mtime = write_atomic(SETUP_FILE, orjson.dumps(state, option=JSON_WRITE_OPTS))
+    _state_cache = (mtime, dict(state))
+
+
+# Project ID from the service account key and the key's mtime, swapped together
+_key_cache = (None, None)
+
+
+def get_key_project():
+    """Return (has_key, project_id) for the uploaded service account key."""
+    global _key_cache
+
+    try:
+        mtime = SA_KEY_FILE.stat().st_mtime_ns
+    except FileNotFoundError:
+        return False, None
+
+    cached_mtime, project_id = _key_cache
+    if mtime != cached_mtime:
+        try:
+            project_id = orjson.loads(SA_KEY_FILE.read_bytes()).get("project_id")
+        except Exception:
+            project_id = None
+        _key_cache = (mtime, project_id)
+
+    return True, project_id
+
+
+# Service account credentials, keyed on the key file's mtime so the cached
+# token survives across calls until the key is replaced
+_creds_cache = (None, None)
+_creds_lock = threading.Lock()
+
+# Token refreshes reuse one connection to oauth2.googleapis.com
+_token_session = requests.Session()
 
 
 def get_credentials():
     """Load service account credentials."""
-    if not SA_KEY_FILE.exists():
+    global _creds_cache
+
+    mtime = file_version(SA_KEY_FILE)
+    if not mtime:
         return None
 
+    cached_mtime, creds = _creds_cache
+    if mtime == cached_mtime:
+        return creds
+
     try:
         creds = service_account.Credentials.from_service_account_file(
             str(SA_KEY_FILE), scopes=SCOPES
         )
-        return creds
     except Exception as e:
         print(f"Error loading credentials: {e}")
-        return None
+        creds = None
+
+    _creds_cache = (mtime, creds)
+    return creds
 
 
 def get_access_token():
     """Get a valid access token."""
-    creds = get_credentials()
-    if not creds:
-        return None
+    # Serialise so concurrent calls share one refresh instead of racing
+    with _creds_lock:
+        creds = get_credentials()
+        if not creds:
+            return None
 
-    # Refresh if needed
-    if not creds.valid:
-        creds.refresh(Request())
+        # Refresh if needed
+        if not creds.valid:
+            creds.refresh(Request(session=_token_session))
 
-    return creds.token
+        return creds.token
 
 
 def gcp_api(method, url, **kwargs):
@@ -98,36 +314,79 @@ def gcp_api(method, url, **kwargs):
         "Authorization": f"Bearer {token}",
         "Content-Type": "application/json",
     }
-    resp = requests.request(method, url, headers=headers, **kwargs)
-    return resp
+    for attempt in range(4):
+        resp = http.request(method, url, headers=headers, **kwargs)
+        if method == "POST" or resp.status_code not in RETRY_STATUSES or attempt == 3:
+            return resp
+        time.sleep(0.3 * 2 ** attempt)
+
+
+def wait_for_operations(names, timeout=30):
+    """Poll Service Usage operations with exponential backoff until all are done."""
+    if not names:
+        return
+
+    # One token for the whole poll loop - it outlives the 30 s budget
+    token = get_access_token()
+    if not token:
+        return
+    headers = {"Authorization": f"Bearer {token}"}
+
+    deadline = time.monotonic() + timeout
+    attempt = 0
+
+    # Best effort, like the fixed sleep it replaces: errors never fail the
+    # deploy, they just keep the operation pending until the budget runs out
+    while names and time.monotonic() < deadline:
+        time.sleep(min(1.6, 0.1 * 2 ** attempt, max(0, deadline - time.monotonic())))
+        attempt += 1
+
+        still_pending = []
+        for name in names:
+            try:
+                resp = http.get(f"https://serviceusage.googleapis.com/v1/{name}", headers=headers,
+                                timeout=max(0.1, deadline - time.monotonic()))
+                if resp.status_code in RETRY_STATUSES:
+                    done = False
+                elif resp.status_code == 200:
+                    done = orjson.loads(resp.content).get("done", False)
+                else:
+                    # Unreadable (e.g. 403/404) - stop tracking it rather than spinning
+                    done = True
+            except (httpx.HTTPError, orjson.JSONDecodeError):
+                done = False
+            if not done:
+                still_pending.append(name)
+        names = still_pending
 
 
 @app.route("/")
 def index():
     """Main page - shows setup wizard or status."""
-    state = get_setup_state()
-    has_key = SA_KEY_FILE.exists()
+    # The page only depends on the state and key files - let repeat loads
+    # revalidate with a 304 instead of re-rendering
+    etag = f"{BOOT_ID}-{file_version(SETUP_FILE)}-{file_version(SA_KEY_FILE)}"
+    if etag in request.if_none_match:
+        resp = Response(status=304)
+    else:
+        state = get_setup_state()
+        has_key, project_id = get_key_project()
 
-    # Get project ID from service account if available
-    project_id = None
-    if has_key:
-        try:
-            sa_data = json.loads(SA_KEY_FILE.read_text())
-            project_id = sa_data.get("project_id")
-        except:
-            pass
+        resp = make_response(render_template("index.html",
+                             state=state,
+                             has_key=has_key,
+                             project_id=project_id,
+                             ingress_path=INGRESS_PATH))
 
-    return render_template("index.html",
-                         state=state,
-                         has_key=has_key,
-                         project_id=project_id,
-                         ingress_path=get_ingress_path())
+    resp.set_etag(etag)
+    resp.headers["Cache-Control"] = "no-cache"
+    return resp
 
 
 @app.route("/entities")
 def entities_page():
     """Entity configuration page."""
-    return render_template("entities.html", ingress_path=get_ingress_path())
+    return render_template("entities.html", ingress_path=INGRESS_PATH)
 
 
 @app.route("/api/upload-key", methods=["POST"])
@@ -136,30 +395,32 @@ def upload_key():
     try:
         # Handle both file upload and JSON paste
         if request.files.get("keyfile"):
-            key_data = request.files["keyfile"].read().decode("utf-8")
+            # orjson parses the raw upload bytes, no separate decode step
+            key_data = request.files["keyfile"].read()
         elif request.json and request.json.get("key"):
             key_data = request.json["key"]
         else:
-            return jsonify({"error": "No key provided"}), 400
+            return ojsonify({"error": "No key provided"}, 400)
 
         # Validate JSON
         try:
-            key_json = json.loads(key_data)
-        except json.JSONDecodeError:
-            return jsonify({"error": "Invalid JSON"}), 400
+            key_json = orjson.loads(key_data)
+        except orjson.JSONDecodeError:
+            return ojsonify({"error": "Invalid JSON"}, 400)
 
         # Check required fields
         required = ["type", "project_id", "private_key", "client_email"]
         missing = [f for f in required if f not in key_json]
         if missing:
-            return jsonify({"error": f"Missing fields: {missing}"}), 400
+            return ojsonify({"error": f"Missing fields: {missing}"}, 400)
 
         if key_json.get("type") != "service_account":
-            return jsonify({"error": "Not a service account key"}), 400
+            return ojsonify({"error": "Not a service account key"}, 400)
 
         # Save key
-        DATA_DIR.mkdir(exist_ok=True)
-        SA_KEY_FILE.write_text(json.dumps(key_json, indent=2))
+        ensure_data_dir()
+        # Kept readable - run.sh copies this into /config for HA
+        SA_KEY_FILE.write_bytes(orjson.dumps(key_json, option=orjson.OPT_INDENT_2))
         SA_KEY_FILE.chmod(0o600)
 
         # Update state
@@ -168,28 +429,28 @@ def upload_key():
         state["project_id"] = key_json["project_id"]
         save_setup_state(state)
 
-        return jsonify({
+        return ojsonify({
             "success": True,
             "project_id": key_json["project_id"]
         })
 
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return ojsonify({"error": str(e)}, 500)
 
 
 @app.route("/api/deploy", methods=["POST"])
 def run_deploy():
     """Deploy Cloud Run using service account."""
     if not SA_KEY_FILE.exists():
-        return jsonify({"error": "No service account key uploaded"}), 400
+        return ojsonify({"error": "No service account key uploaded"}, 400)
 
     state = get_setup_state()
 
     try:
-        sa_data = json.loads(SA_KEY_FILE.read_text())
+        sa_data = orjson.loads(SA_KEY_FILE.read_bytes())
         project_id = sa_data["project_id"]
     except Exception as e:
-        return jsonify({"error": f"Invalid key file: {e}"}), 400
+        return ojsonify({"error": f"Invalid key file: {e}"}, 400)
 
     # Generate password
     password = state.get("password") or generate_password()
@@ -201,78 +462,48 @@ def run_deploy():
         state["step"] = "enabling_apis"
         save_setup_state(state)
 
+        # Enable requests are independent, so fire them concurrently
         apis = ["run.googleapis.com", "cloudbuild.googleapis.com"]
-        for api in apis:
-            resp = gcp_api("POST",
-                f"https://serviceusage.googleapis.com/v1/projects/{project_id}/services/{api}:enable")
-            # Ignore errors - might already be enabled or just need time
-
-        # Wait for APIs to propagate
-        time.sleep(5)
+        with ThreadPoolExecutor(max_workers=len(apis)) as pool:
+            responses = list(pool.map(lambda api: gcp_api("POST",
+                f"https://serviceusage.googleapis.com/v1/projects/{project_id}/services/{api}:enable"),
+                apis))
+
+        # Wait for APIs to propagate. Ignore errors - might already be
+        # enabled or just need time
+        pending = []
+        for resp in responses:
+            if resp and resp.status_code == 200:
+                operation = orjson.loads(resp.content)
+                if not operation.get("done") and operation.get("name"):
+                    pending.append(operation["name"])
+        wait_for_operations(pending)
 
         # Step 2: Deploy Cloud Run
         state["step"] = "deploying"
         save_setup_state(state)
 
-        region = "us-central1"
-        service_name = "ha-tunnel"
-
-        # Use the v1 API for Cloud Run
-        service_config = {
-            "apiVersion": "serving.knative.dev/v1",
-            "kind": "Service",
-            "metadata": {
-                "name": service_name,
-                "namespace": project_id,
-                "annotations": {
-                    "run.googleapis.com/ingress": "all",
-                    "run.googleapis.com/launch-stage": "BETA"
-                }
-            },
-            "spec": {
-                "template": {
-                    "metadata": {
-                        "annotations": {
-                            "autoscaling.knative.dev/minScale": "0",
-                            "autoscaling.knative.dev/maxScale": "1",
-                            "run.googleapis.com/cpu-throttling": "true"
-                        }
-                    },
-                    "spec": {
-                        "containerConcurrency": 80,
-                        "timeoutSeconds": 3600,
-                        "containers": [{
-                            "image": TUNNEL_IMAGE,
-                            "env": [
-                                {"name": "AUTH", "value": f"hauser:{password}"}
-                            ],
-                            "resources": {
-                                "limits": {
-                                    "cpu": "1",
-                                    "memory": "256Mi"
-                                }
-                            },
-                            "ports": [{"containerPort": 8080}]
-                        }]
-                    }
-                }
-            }
-        }
+        # Only the project and password vary per deploy
+        service_body = (_SERVICE_CONFIG_TEMPLATE
+                        .replace(b'"__PROJECT_ID__"', orjson.dumps(project_id))
+                        .replace(b'"__AUTH__"', orjson.dumps(f"hauser:{password}")))
 
-        # Try to create or replace the service
-        resp = gcp_api("POST",
-            f"https://{region}-run.googleapis.com/apis/serving.knative.dev/v1/namespaces/{project_id}/services",
-            json=service_config)
+        services_url = f"https://{REGION}-run.googleapis.com/apis/serving.knative.dev/v1/namespaces/{project_id}/services"
+        service_endpoint = f"{services_url}/{SERVICE_NAME}"
 
-        if resp and resp.status_code not in [200, 201, 409]:
-            # Try update if create fails
-            resp = gcp_api("PUT",
-                f"https://{region}-run.googleapis.com/apis/serving.knative.dev/v1/namespaces/{project_id}/services/{service_name}",
-                json=service_config)
+        # Replace the service if it already exists (re-runs), otherwise create it
+        resp = gcp_api("GET", service_endpoint)
+        if resp is not None and resp.status_code == 200:
+            resp = gcp_api("PUT", service_endpoint, content=service_body)
+        else:
+            resp = gcp_api("POST", services_url, content=service_body)
+            if resp is not None and resp.status_code == 409:
+                # Created since the lookup - fall back to replacing it
+                resp = gcp_api("PUT", service_endpoint, content=service_body)
 
-        if not resp or resp.status_code not in [200, 201]:
-            error_msg = resp.text if resp else "No response"
-            return jsonify({"error": f"Deploy failed: {error_msg}"}), 500
+        if resp is None or resp.status_code not in [200, 201]:
+            error_msg = resp.text if resp is not None else "No response"
+            return ojsonify({"error": f"Deploy failed: {error_msg}"}, 500)
 
         # Wait for deployment
         time.sleep(10)
@@ -281,38 +512,31 @@ def run_deploy():
         state["step"] = "configuring"
         save_setup_state(state)
 
-        iam_policy = {
-            "policy": {
-                "bindings": [{
-                    "role": "roles/run.invoker",
-                    "members": ["allUsers"]
-                }]
-            }
-        }
+        service_path = f"https://run.googleapis.com/v1/projects/{project_id}/locations/{REGION}/services/{SERVICE_NAME}"
 
-        gcp_api("POST",
-            f"https://run.googleapis.com/v1/projects/{project_id}/locations/{region}/services/{service_name}:setIamPolicy",
-            json=iam_policy)
-
-        # Step 4: Get service URL
-        resp = gcp_api("GET",
-            f"https://run.googleapis.com/v1/projects/{project_id}/locations/{region}/services/{service_name}")
+        # Step 4: Get service URL - independent of the IAM update, so overlap them
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            iam_future = pool.submit(gcp_api, "POST", f"{service_path}:setIamPolicy", content=_IAM_POLICY_BODY)
+            resp = pool.submit(gcp_api, "GET", service_path).result()
+            # Surface IAM failures (timeouts, token errors) like before
+            iam_future.result()
 
         if resp and resp.status_code == 200:
-            service_data = resp.json()
+            service_data = orjson.loads(resp.content)
             service_url = service_data.get("status", {}).get("url", "")
             state["server_url"] = service_url
         else:
             # Construct URL from convention
-            state["server_url"] = f"https://{service_name}-{project_id}.{region}.run.app"
+            state["server_url"] = f"https://{SERVICE_NAME}-{project_id}.{REGION}.run.app"
 
         state["step"] = "complete"
         save_setup_state(state)
 
-        # Update add-on configuration
-        update_addon_config(state)
+        # Update add-on configuration in the background - the supervisor
+        # call and restart don't need to hold up this response
+        threading.Thread(target=update_addon_config, args=(dict(state),), daemon=True).start()
 
-        return jsonify({
+        return ojsonify({
             "success": True,
             "project_id": project_id,
             "server_url": state.get("server_url", ""),
@@ -322,13 +546,12 @@ def run_deploy():
     except Exception as e:
         import traceback
         traceback.print_exc()
-        return jsonify({"error": str(e)}), 500
+        return ojsonify({"error": str(e)}, 500)
 
 
 def update_addon_config(state):
     """Update the add-on's configuration via Supervisor API."""
-    supervisor_token = os.environ.get("SUPERVISOR_TOKEN")
-    if not supervisor_token:
+    if not SUPERVISOR_TOKEN:
         return
 
     config = {
@@ -343,94 +566,107 @@ def update_addon_config(state):
     }
 
     try:
-        resp = requests.post(
+        resp = http.post(
             "http://supervisor/addons/self/options",
-            headers={"Authorization": f"Bearer {supervisor_token}"},
+            headers={"Authorization": f"Bearer {SUPERVISOR_TOKEN}"},
             json={"options": config}
         )
 
         if resp.status_code == 200:
             # Restart add-on to apply config
-            requests.post(
+            http.post(
                 "http://supervisor/addons/self/restart",
-                headers={"Authorization": f"Bearer {supervisor_token}"}
+                headers={"Authorization": f"Bearer {SUPERVISOR_TOKEN}"}
             )
     except Exception as e:
         print(f"Failed to update config: {e}")
 
 
+# Encoded /api/status body, keyed on the state and key file mtimes
+_status_cache = (None, b"")
+
+
 @app.route("/api/status")
 def get_status():
     """Get current setup status."""
-    state = get_setup_state()
-    has_key = SA_KEY_FILE.exists()
+    global _status_cache
 
-    project_id = None
-    if has_key:
-        try:
-            sa_data = json.loads(SA_KEY_FILE.read_text())
-            project_id = sa_data.get("project_id")
-        except:
-            pass
-
-    return jsonify({
-        "has_key": has_key,
-        "project_id": project_id,
-        "step": state.get("step", "start"),
-        "server_url": state.get("server_url"),
-        "has_password": state.get("password") is not None
-    })
+    key = (file_version(SETUP_FILE), file_version(SA_KEY_FILE))
+    cached_key, body = _status_cache
+    if key != cached_key:
+        state = get_setup_state()
+        has_key, project_id = get_key_project()
+
+        body = orjson.dumps({
+            "has_key": has_key,
+            "project_id": project_id,
+            "step": state.get("step", "start"),
+            "server_url": state.get("server_url"),
+            "has_password": state.get("password") is not None
+        })
+        # Swap key and body together so concurrent polls never mix them
+        _status_cache = (key, body)
+
+    etag = f"{key[0]}-{key[1]}"
+    if etag in request.if_none_match:
+        resp = Response(status=304)
+    else:
+        resp = Response(body, mimetype="application/json")
+
+    resp.set_etag(etag)
+    resp.headers["Cache-Control"] = "no-cache"
+    return resp
 
 
 ENTITY_CONFIG_FILE = DATA_DIR / "entity_config.json"
 
+# Domains we expose to Google Assistant
+EXPOSED_DOMAINS = frozenset([
+    "light", "switch", "input_boolean", "climate", "fan", "humidifier",
+    "water_heater", "cover", "valve", "lock", "alarm_control_panel",
+    "media_player", "sensor", "binary_sensor", "scene", "script",
+    "input_select", "select", "button", "input_button", "vacuum",
+    "lawn_mower", "camera"
+])
+
 
 def get_entity_config():
     """Load entity configuration."""
-    if ENTITY_CONFIG_FILE.exists():
-        return json.loads(ENTITY_CONFIG_FILE.read_text())
-    return {}
+    try:
+        return orjson.loads(ENTITY_CONFIG_FILE.read_bytes())
+    except FileNotFoundError:
+        return {}
 
 
 def save_entity_config(config):
     """Save entity configuration."""
-    DATA_DIR.mkdir(exist_ok=True)
-    ENTITY_CONFIG_FILE.write_text(json.dumps(config, indent=2))
+    ensure_data_dir()
+    write_atomic(ENTITY_CONFIG_FILE, orjson.dumps(config, option=JSON_WRITE_OPTS))
 
 
 @app.route("/api/entities")
 def get_entities():
     """Get list of HA entities that can be exposed to Google Assistant."""
-    supervisor_token = os.environ.get("SUPERVISOR_TOKEN")
-    if not supervisor_token:
-        return jsonify({"error": "Not running in HA environment"}), 500
-
-    # Domains we expose to Google Assistant
-    exposed_domains = [
-        "light", "switch", "input_boolean", "climate", "fan", "humidifier",
-        "water_heater", "cover", "valve", "lock", "alarm_control_panel",
-        "media_player", "sensor", "binary_sensor", "scene", "script",
-        "input_select", "select", "button", "input_button", "vacuum",
-        "lawn_mower", "camera"
-    ]
+    if not SUPERVISOR_TOKEN:
+        return ojsonify({"error": "Not running in HA environment"}, 500)
 
     try:
-        resp = requests.get(
+        resp = http.get(
             "http://supervisor/core/api/states",
-            headers={"Authorization": f"Bearer {supervisor_token}"}
+            headers={"Authorization": f"Bearer {SUPERVISOR_TOKEN}"}
         )
         if resp.status_code != 200:
-            return jsonify({"error": "Failed to fetch entities"}), 500
+            return ojsonify({"error": "Failed to fetch entities"}, 500)
 
-        all_states = resp.json()
+        all_states = orjson.loads(resp.content)
         entity_config = get_entity_config()
 
         entities = []
         for state in all_states:
             entity_id = state.get("entity_id", "")
-            domain = entity_id.split(".")[0] if "." in entity_id else ""
+            domain = entity_id.partition(".")[0] if "." in entity_id else ""
 
-            if domain in exposed_domains:
+            if domain in EXPOSED_DOMAINS:
                 config = entity_config.get(entity_id, {})
                 entities.append({
                     "entity_id": entity_id,
@@ -445,10 +681,10 @@ def get_entities():
 
         # Sort by domain then name
         entities.sort(key=lambda e: (e["domain"], e["friendly_name"]))
-        return jsonify({"entities": entities})
+        return ojsonify({"entities": entities})
 
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return ojsonify({"error": str(e)}, 500)
 
 
 @app.route("/api/entities", methods=["POST"])
@@ -457,7 +693,7 @@ def save_entities():
     try:
         data = request.json
         if not data or "entities" not in data:
-            return jsonify({"error": "No entities provided"}), 400
+            return ojsonify({"error": "No entities provided"}, 400)
 
         # Convert list to dict keyed by entity_id
         config = {}
@@ -476,10 +712,10 @@ def save_entities():
         # Regenerate the google_assistant package with entity_config
         regenerate_ga_package(config)
 
-        return jsonify({"success": True, "count": len(config)})
+        return ojsonify({"success": True, "count": len(config)})
 
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return ojsonify({"error": str(e)}, 500)
 
 
 def regenerate_ga_package(entity_config):
@@ -710,7 +946,7 @@ echo "4. Configure Account Linking"
 echo "=========================================="
 '''
 
-    return jsonify({"script": script})
+    return ojsonify({"script": script})
 
 
 @app.route("/health")
@@ -736,7 +972,7 @@ def health():
     except:
         pass
 
-    return jsonify({
+    return ojsonify({
         "status": "healthy" if tunnel_connected else "disconnected",
         "tunnel_connected": tunnel_connected,
         "proxy_running": proxy_running,
@@ -748,4 +984,5 @@ def health():
 
 
 if __name__ == "__main__":
+    # Development fallback - the add-on runs this app under gunicorn (see run.sh)
     app.run(host="0.0.0.0", port=8099, debug=False)